@@ -1,3 +1,6 @@
+import os
+
+import orjson
 import streamlit as st
 import pandas as pd
 import requests
@@ -8,17 +11,51 @@ st.title("📈 Asset Recommender")
 # ---- EDIT THIS if your FastAPI endpoint is different (check /docs) ----
 API_URL = "http://127.0.0.1:8000/recommend"   # e.g. /recommend or /recommendations
 
-@st.cache_data
-def load_assets():
-    df = pd.read_csv("asset_information.csv")
-    df.columns = [c.strip() for c in df.columns]
-    return df
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One pooled Session shared across reruns (keep-alive, no per-click TCP handshake)."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1)
+    session.mount("http://", adapter)
+    return session
+
+SESSION = get_session()
 
-assets = load_assets()
+ASSET_PARQUET_PATH = "asset_information.parquet"
+DISPLAY_COLUMNS = ["ISIN", "assetName", "assetShortName", "assetCategory", "assetSubCategory", "sector"]
 
-# Try to detect which column in CSV stores Asset IDs
-possible_cols = ["asset_id", "Asset ID", "assetId", "ISIN", "isin", "id", "ID"]
-asset_id_col = next((c for c in possible_cols if c in assets.columns), assets.columns[0])
+# cache_resource shares one DataFrame across reruns without pickling a copy
+# on every retrieval; treat the returned frame as read-only. Detecting the
+# asset-id column in here means it runs once, not on every widget interaction.
+@st.cache_resource
+def load_assets():
+    df = pd.read_parquet(ASSET_PARQUET_PATH, columns=DISPLAY_COLUMNS, engine="pyarrow")
+    df.columns = [c.strip() for c in df.columns]
+    possible_cols = ["asset_id", "Asset ID", "assetId", "ISIN", "isin", "id", "ID"]
+    id_col = next((c for c in possible_cols if c in df.columns), df.columns[0])
+    df[id_col] = df[id_col].astype(str)
+    # Index on the id column (kept as a column too) so bulk lookups go
+    # through get_indexer's C-level hash table. The catalog contains
+    # duplicate ids; keep the first occurrence since get_indexer requires
+    # a unique index.
+    df = df.set_index(id_col, drop=False)
+    df = df[~df.index.duplicated(keep="first")]
+    return df, id_col
+
+assets, asset_id_col = load_assets()
+
+def lookup_assets(df: pd.DataFrame, rec_ids: list) -> pd.DataFrame:
+    """Rows for rec_ids in API order, via the unique asset-id index."""
+    idxs = df.index.get_indexer(rec_ids)
+    return df.iloc[idxs[idxs >= 0]]
+
+# Table rows are deterministic in the returned id list, so cache the
+# serialized records instead of re-serializing the frame on every rerun;
+# the file mtime in the key invalidates when the data changes.
+@st.cache_data
+def get_table_rows(rec_ids_tuple: tuple, asset_mtime: float) -> list:
+    df, _ = load_assets()
+    return lookup_assets(df, list(rec_ids_tuple)).to_dict("records")
 
 st.subheader("Input")
 c1, c2, c3 = st.columns([2, 1, 1])
@@ -39,9 +76,14 @@ if st.button("Get Recommendations 🚀", type="primary"):
     try:
         with st.spinner("Calling backend..."):
             # Most common: POST JSON body. If your backend uses GET, tell me and I’ll switch it.
-            r = requests.post(API_URL, json=payload, timeout=15)
+            r = SESSION.post(
+                API_URL,
+                data=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=(3, 15),
+            )
             r.raise_for_status()
-            rec_ids = r.json()  # expected: list of asset IDs
+            rec_ids = orjson.loads(r.content)  # expected: list of asset IDs
     except Exception as e:
         st.error(f"API call failed: {e}")
         st.stop()
@@ -56,14 +98,9 @@ if st.button("Get Recommendations 🚀", type="primary"):
     st.caption("Returned Asset IDs:")
     st.code(rec_ids)
 
-    # Filter assets by returned IDs + preserve order
-    assets[asset_id_col] = assets[asset_id_col].astype(str)
+    # Filter assets by returned IDs; vectorized index lookups preserve API order.
     rec_ids = [str(x) for x in rec_ids]
-
-    rec_df = assets[assets[asset_id_col].isin(rec_ids)].copy()
-    order_map = {aid: i for i, aid in enumerate(rec_ids)}
-    rec_df["__order"] = rec_df[asset_id_col].map(order_map)
-    rec_df = rec_df.sort_values("__order").drop(columns="__order")
+    rec_df = lookup_assets(assets, rec_ids).copy()
 
     if rec_df.empty:
         st.warning(
@@ -76,17 +113,26 @@ if st.button("Get Recommendations 🚀", type="primary"):
     tab1, tab2 = st.tabs(["✨ Card View", "📋 Table View"])
 
     with tab1:
-        for _, row in rec_df.iterrows():
+        # dict records avoid iterrows' per-row Series construction; resolve
+        # which optional columns exist once instead of per row.
+        detail_cols = [
+            c for c in ["type", "Type", "asset_type", "currency", "Currency", "risk", "Risk", "sector", "Sector"]
+            if c in rec_df.columns
+        ]
+        for row in rec_df.to_dict("records"):
             with st.container(border=True):
                 st.markdown(f"**{row.get('name', row.get('ticker', row[asset_id_col]))}**")
                 st.caption(f"Asset ID: `{row[asset_id_col]}`")
                 # show a few common fields if present
-                for col in ["type", "Type", "asset_type", "currency", "Currency", "risk", "Risk", "sector", "Sector"]:
-                    if col in rec_df.columns and pd.notna(row.get(col)):
+                for col in detail_cols:
+                    if pd.notna(row[col]):
                         st.write(f"{col}: {row[col]}")
 
     with tab2:
-        st.dataframe(rec_df, use_container_width=True)
+        st.dataframe(
+            get_table_rows(tuple(rec_ids), os.path.getmtime(ASSET_PARQUET_PATH)),
+            use_container_width=True,
+        )
 
     st.download_button(
         "Download CSV",
@@ -1,30 +1,163 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from cachetools import TTLCache
+from multiprocessing import shared_memory
+import asyncio
+import functools
+import hashlib
 import pickle
+import time
+import numpy as np
 import pandas as pd
 from typing import List, Optional
 
-app = FastAPI(title="FinPro Robo-Advisor API")
+app = FastAPI(title="FinPro Robo-Advisor API", default_response_class=ORJSONResponse)
 
 # --- 1. GLOBAL STATE (Load Model & Data on Startup) ---
 # Ensure these files are in the same folder as main.py
 try:
     with open('model_svd.pkl', 'rb') as f:
-        MODEL_SVD = pickle.load(f)
+        _model_bytes = f.read()
+    MODEL_SVD = pickle.loads(_model_bytes)
+    # Identifies this model build; keys the shared-memory block names below
+    # so workers never attach to blocks from a different model version.
+    MODEL_HASH = hashlib.md5(_model_bytes).hexdigest()[:12]
+    del _model_bytes
     print("✅ SVD Model Loaded")
 except FileNotFoundError:
     print("❌ ERROR: model_svd.pkl not found. API will fail for existing users.")
     MODEL_SVD = None
+    MODEL_HASH = "none"
 
-# Load Asset Metadata (needed for filtering/Cold Start)
+# Precompute scoring arrays once so warm-start scoring is a single matmul
+# instead of one MODEL_SVD.predict() call per asset.
+# With `uvicorn main:app --workers N` every worker loads its own pickle; the
+# factor matrices are the bulk of that memory, so back them with named
+# shared-memory blocks. The first worker to get here creates and fills each
+# block, later workers attach and view the same bytes.
+SHM_PREFIX = "finpro_svd"
+SHM_BLOCKS = []  # every attached block; kept so the buffers outlive startup
+SHM_OWNED = []   # blocks this worker created; unlinked on shutdown
+
+def _share_array(name: str, arr: np.ndarray) -> np.ndarray:
+    # Block names embed the model hash so a restart after retraining never
+    # reuses a stale block, and the trailing "ready" byte gates attachment
+    # until the creator has finished filling the buffer.
+    full_name = f"{SHM_PREFIX}_{MODEL_HASH}_{name}"
+    try:
+        shm = shared_memory.SharedMemory(name=full_name, create=True, size=arr.nbytes + 1)
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[:] = arr
+        shm.buf[arr.nbytes] = 1  # fill complete
+        SHM_OWNED.append(shm)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=full_name)
+        deadline = time.monotonic() + 5.0
+        while shm.buf[arr.nbytes] != 1:
+            if time.monotonic() >= deadline:
+                shm.close()
+                raise TimeoutError(f"shared block {full_name} was never marked ready")
+            time.sleep(0.01)
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    SHM_BLOCKS.append(shm)
+    return view
+
+if MODEL_SVD is not None:
+    TRAINSET = MODEL_SVD.trainset
+    GLOBAL_MEAN = TRAINSET.global_mean
+    RAW_IIDS = np.array(
+        [TRAINSET.to_raw_iid(i) for i in TRAINSET.all_items()], dtype=object
+    )
+    # Matmul scoring needs the factor matrices; other Surprise algos
+    # (e.g. KNN baselines) fall back to the batch test() interface.
+    HAS_FACTORS = hasattr(MODEL_SVD, 'pu')
+    if HAS_FACTORS:
+        # Surprise stores factors as float64; FP32 is plenty for ranking and
+        # halves memory bandwidth in the scoring matmuls.
+        MODEL_SVD.pu = np.ascontiguousarray(MODEL_SVD.pu, dtype=np.float32)
+        MODEL_SVD.bu = MODEL_SVD.bu.astype(np.float32)
+        # Fuse the bias terms into an augmented item matrix so scoring is a
+        # single matmul with no broadcast temporaries: qi_aug rows are
+        # [qi, bi, 1] and the matching user vector is [pu, 1, bu + mean].
+        _qi32 = np.ascontiguousarray(MODEL_SVD.qi, dtype=np.float32)
+        _bi32 = MODEL_SVD.bi.astype(np.float32)
+        QI_AUG = np.ascontiguousarray(np.hstack([
+            _qi32,
+            _bi32[:, None],
+            np.ones((_qi32.shape[0], 1), dtype=np.float32),
+        ]))
+        del _qi32, _bi32
+        try:
+            # Share the fused matrix, not raw qi: it is the only item-side
+            # array scoring reads, so sharing qi would just leave each worker
+            # holding a same-sized private augment on top of it.
+            MODEL_SVD.pu = _share_array('pu', MODEL_SVD.pu)
+            MODEL_SVD.bu = _share_array('bu', MODEL_SVD.bu)
+            QI_AUG = _share_array('qi_aug', QI_AUG)
+            print("✅ SVD factors mapped to shared memory")
+        except Exception as e:
+            print(f"ℹ️ Shared memory unavailable ({e}); keeping per-process copies.")
+        # Serving only reads pu/bu/QI_AUG from here on; drop the pickle's
+        # float64 item arrays so each worker doesn't keep private copies.
+        MODEL_SVD.qi = None
+        MODEL_SVD.bi = None
+    else:
+        QI_AUG = None
+else:
+    TRAINSET = None
+    GLOBAL_MEAN = 0.0
+    RAW_IIDS = np.array([], dtype=object)
+    HAS_FACTORS = False
+    QI_AUG = None
+
+# Load Asset Metadata (needed for filtering/Cold Start).
+# Parquet (preconverted from asset_information.csv) avoids re-parsing text on
+# every start, and only the columns the API uses are read.
 try:
-    df_assets = pd.read_csv('asset_information.csv')
-    ALL_ASSET_IDS = df_assets['ISIN'].unique()
+    df_assets = pd.read_parquet(
+        'asset_information.parquet',
+        columns=['ISIN', 'assetCategory'],
+        engine='pyarrow',
+    )
+    df_assets['assetCategory'] = df_assets['assetCategory'].astype('category')
     print("✅ Asset Data Loaded")
 except Exception as e:
     print(f"❌ Error loading assets: {e}")
     df_assets = pd.DataFrame()
-    ALL_ASSET_IDS = []
+
+# Optional ANN index for sublinear top-k on large catalogs. Below the
+# threshold the exact matmul is already sub-millisecond, and HNSW ignores
+# bias terms, so only trade exactness away where the full pass would hurt.
+HNSW_MIN_ITEMS = 10_000
+HNSW_INDEX = None
+if MODEL_SVD is not None and HAS_FACTORS and len(RAW_IIDS) >= HNSW_MIN_ITEMS:
+    try:
+        import hnswlib
+        # Raw item factors are the first columns of the fused matrix; the
+        # ANN path ignores the bias terms anyway.
+        _item_factors = np.ascontiguousarray(QI_AUG[:, :-2])
+        HNSW_INDEX = hnswlib.Index(space='ip', dim=_item_factors.shape[1])
+        HNSW_INDEX.init_index(
+            max_elements=_item_factors.shape[0], ef_construction=200, M=16
+        )
+        HNSW_INDEX.add_items(_item_factors, np.arange(_item_factors.shape[0]))
+        del _item_factors
+        print("✅ HNSW Index Built")
+    except ImportError:
+        print("ℹ️ hnswlib not installed; using exact top-k scoring.")
+
+# Cold-start lists are fixed per risk profile, so build them once instead
+# of re-filtering df_assets on every request.
+if not df_assets.empty:
+    COLD_START_CACHE = {
+        "Conservative": df_assets[df_assets['assetCategory'].isin(['Bond'])]['ISIN'].tolist(),
+        "Aggressive": df_assets[df_assets['assetCategory'].isin(['Stock'])]['ISIN'].tolist(),
+        "Balanced": df_assets[df_assets['assetCategory'].isin(['Stock', 'MTF'])]['ISIN'].tolist(),
+    }
+else:
+    COLD_START_CACHE = {"Conservative": [], "Aggressive": [], "Balanced": []}
 
 # --- 2. DATA MODELS ---
 class RecommendationRequest(BaseModel):
@@ -38,51 +171,194 @@ class RecommendationResponse(BaseModel):
     recommendations: List[str]
 
 # --- 3. HELPER FUNCTIONS ---
-def get_cold_start_recs(risk_profile: str, top_k: int) -> List[str]:
-    """Fallback logic for new users"""
+@functools.lru_cache(maxsize=128)
+def get_cold_start_recs(risk_profile: str, top_k: int) -> tuple:
+    """Fallback logic for new users.
+
+    Pure-Python over the precomputed lists — no pandas on the serving path —
+    and memoized per (profile, top_k), so repeat cold starts cost one dict hit.
+    Returns a tuple so cached values stay immutable.
+    """
     if 'Conservative' in risk_profile:
-        target_cats = ['Bond']
+        key = 'Conservative'
     elif 'Aggressive' in risk_profile:
-        target_cats = ['Stock']
+        key = 'Aggressive'
     else:
-        target_cats = ['Stock', 'MTF'] 
-    
-    candidates = df_assets[df_assets['assetCategory'].isin(target_cats)]
-    return candidates.head(top_k)['ISIN'].tolist()
-
-def get_warm_start_recs(user_id: str, top_k: int) -> List[str]:
-    """SVD Logic for existing users"""
-    predictions = []
-    for asset_id in ALL_ASSET_IDS:
-        pred = MODEL_SVD.predict(user_id, asset_id)
-        predictions.append((asset_id, pred.est))
-    
-    predictions.sort(key=lambda x: x[1], reverse=True)
-    return [x[0] for x in predictions[:top_k]]
+        key = 'Balanced'
+    return tuple(COLD_START_CACHE[key][:top_k])
+
+def fill_to_top_k(recs: List[str], top_k: int) -> List[str]:
+    """Pad with cold-start assets when the trainset has fewer items than top_k
+    (e.g. assets added to the catalog after the last retrain)."""
+    if len(recs) >= top_k:
+        return recs
+    seen = set(recs)
+    for isin in COLD_START_CACHE['Balanced']:
+        if isin not in seen:
+            recs.append(isin)
+            if len(recs) >= top_k:
+                break
+    return recs
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, ordered best-first.
+
+    argpartition + partial sort is O(N + k log k) vs O(N log N) for a full sort.
+    """
+    k = min(top_k, scores.size)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+def get_warm_start_recs(user_id: str, top_k: int, iuid: Optional[int] = None) -> List[str]:
+    """SVD Logic for existing users (vectorized: one matmul over all items)"""
+    if not HAS_FACTORS:
+        # Batch interface: one test() call skips predict()'s per-item
+        # validation even without factor matrices to matmul.
+        testset = [(user_id, iid, 0.0) for iid in RAW_IIDS]
+        preds = MODEL_SVD.test(testset)
+        preds.sort(key=lambda p: p.est, reverse=True)
+        return fill_to_top_k([p.iid for p in preds[:top_k]], top_k)
+
+    if iuid is None:
+        iuid = TRAINSET._raw2inner_id_users[user_id]
+
+    if HNSW_INDEX is not None:
+        HNSW_INDEX.set_ef(max(50, top_k * 4))
+        labels, _ = HNSW_INDEX.knn_query(
+            MODEL_SVD.pu[iuid], k=min(top_k, len(RAW_IIDS))
+        )
+        return fill_to_top_k(RAW_IIDS[labels[0]].tolist(), top_k)
+
+    pu_aug = np.concatenate([
+        MODEL_SVD.pu[iuid],
+        np.array([1.0, MODEL_SVD.bu[iuid] + GLOBAL_MEAN], dtype=QI_AUG.dtype),
+    ])
+    scores = QI_AUG @ pu_aug
+    top = top_k_indices(scores, top_k)
+    return fill_to_top_k(RAW_IIDS[top].tolist(), top_k)
+
+# --- 3b. MICRO-BATCHED SCORING ---
+# Warm-start requests arriving within a short window share one GEMM
+# (pu[iuids] @ qi.T) instead of each paying its own scoring pass.
+BATCH_QUEUE: asyncio.Queue = asyncio.Queue()
+BATCH_TASK = None
+MAX_BATCH = 32
+MAX_WAIT_MS = 5
+
+def score_user_batch(iuids: List[int], top_ks: List[int]) -> List[List[str]]:
+    """Score a stack of users in one matmul and return per-user top-k ISINs."""
+    iuid_arr = np.asarray(iuids)
+    pu = MODEL_SVD.pu[iuid_arr]
+
+    if HNSW_INDEX is not None:
+        # ANN answers the whole batch in one knn_query; query at the largest
+        # requested k and slice per user.
+        k = min(max(top_ks), len(RAW_IIDS))
+        HNSW_INDEX.set_ef(max(50, k * 4))
+        labels, _ = HNSW_INDEX.knn_query(pu, k=k)
+        return [
+            fill_to_top_k(RAW_IIDS[row[:top_k]].tolist(), top_k)
+            for row, top_k in zip(labels, top_ks)
+        ]
+
+    pu_aug = np.hstack([
+        pu,
+        np.ones((pu.shape[0], 1), dtype=pu.dtype),
+        (MODEL_SVD.bu[iuid_arr] + GLOBAL_MEAN)[:, None].astype(pu.dtype),
+    ])
+    scores = pu_aug @ QI_AUG.T
+    results = []
+    for row, top_k in zip(scores, top_ks):
+        top = top_k_indices(row, top_k)
+        results.append(fill_to_top_k(RAW_IIDS[top].tolist(), top_k))
+    return results
+
+async def batch_worker():
+    """Coalesce queued warm-start requests into one scoring call per window."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await BATCH_QUEUE.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(BATCH_QUEUE.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        iuids = [item[0] for item in batch]
+        top_ks = [item[1] for item in batch]
+        try:
+            results = await run_in_threadpool(score_user_batch, iuids, top_ks)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, _, future), recs in zip(batch, results):
+            if not future.done():
+                future.set_result(recs)
+
+@app.on_event("startup")
+async def start_batch_worker():
+    global BATCH_TASK
+    if MODEL_SVD is not None and HAS_FACTORS:
+        BATCH_TASK = asyncio.create_task(batch_worker())
+
+@app.on_event("shutdown")
+def release_shared_factors():
+    for shm in SHM_BLOCKS:
+        shm.close()
+    for shm in SHM_OWNED:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass  # another worker already unlinked it
 
 # --- 4. API ENDPOINT ---
+# Responses are deterministic per (user, profile, k) until the model is
+# retrained, so cache them for a few minutes. The process restarts on model
+# reload, which also drops the cache.
+RESP_CACHE = TTLCache(maxsize=10_000, ttl=600)
+
 @app.post("/recommend", response_model=RecommendationResponse)
-def recommend(request: RecommendationRequest):
-    use_ai = False
-    if MODEL_SVD:
-        try:
-            MODEL_SVD.trainset.to_inner_uid(request.user_id)
-            use_ai = True
-        except ValueError:
-            use_ai = False 
+async def recommend(request: RecommendationRequest):
+    cache_key = (request.user_id, request.risk_profile, request.top_k)
+    cached = RESP_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Known-user check via the raw->inner dict: to_inner_uid raises for
+    # every cold-start user, and exceptions are costly on the hot path.
+    iuid = None
+    if MODEL_SVD is not None:
+        iuid = TRAINSET._raw2inner_id_users.get(request.user_id)
 
-    if use_ai:
-        recs = get_warm_start_recs(request.user_id, request.top_k)
+    if iuid is not None:
+        if BATCH_TASK is not None:
+            # Join the micro-batch: requests in the same window share one GEMM.
+            future = asyncio.get_running_loop().create_future()
+            await BATCH_QUEUE.put((iuid, request.top_k, future))
+            recs = await future
+        else:
+            # CPU-bound scoring: run in the threadpool so the event loop stays free.
+            recs = await run_in_threadpool(
+                get_warm_start_recs, request.user_id, request.top_k, iuid
+            )
         source = "AI Model (SVD)"
     else:
-        recs = get_cold_start_recs(request.risk_profile, request.top_k)
+        recs = list(get_cold_start_recs(request.risk_profile, request.top_k))
         source = f"Rule-Based ({request.risk_profile})"
 
-    return {
+    response = {
         "user_id": request.user_id,
         "source": source,
         "recommendations": recs
     }
+    RESP_CACHE[cache_key] = response
+    return response
 
 @app.get("/")
 def health_check():
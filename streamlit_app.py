@@ -1,5 +1,8 @@
 
 
+import os
+
+import orjson
 import streamlit as st
 import pandas as pd
 import requests
@@ -14,7 +17,20 @@ API_BASE = "http://127.0.0.1:8000"
 RECOMMEND_ENDPOINT = "/recommend"
 API_URL = API_BASE.rstrip("/") + RECOMMEND_ENDPOINT
 
-ASSET_CSV_PATH = "asset_information.csv"
+ASSET_PARQUET_PATH = "asset_information.parquet"
+DISPLAY_COLUMNS = ["ISIN", "assetName", "assetShortName", "assetCategory", "assetSubCategory", "sector"]
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One pooled Session shared across reruns (keep-alive, no per-click TCP handshake)."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1)
+    session.mount("http://", adapter)
+    return session
+
+
+SESSION = get_session()
 
 # Put some sample IDs here that are known to exist in the SVD trainset.
 # If you don't know them yet, leave as placeholders and test once you get 1-3 real IDs.
@@ -24,21 +40,46 @@ SAMPLE_AI_USERS = ["U1001", "U2049", "U3302"]  # <-- replace with real existing
 # -----------------------------
 # DATA LOAD
 # -----------------------------
-@st.cache_data
+# cache_resource shares one DataFrame across reruns without pickling a copy
+# on every retrieval; treat the returned frame as read-only.
+@st.cache_resource
 def load_assets(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
+    df = pd.read_parquet(path, columns=DISPLAY_COLUMNS, engine="pyarrow")
     df.columns = [c.strip() for c in df.columns]
+    if "ISIN" in df.columns:
+        df["ISIN"] = df["ISIN"].astype(str)
+        # Index on ISIN (kept as a column too) so bulk lookups go through
+        # get_indexer's C-level hash table. The catalog contains duplicate
+        # ISINs; keep the first occurrence since get_indexer requires a
+        # unique index.
+        df = df.set_index("ISIN", drop=False)
+        df = df[~df.index.duplicated(keep="first")]
     return df
 
 
+def lookup_assets(df: pd.DataFrame, rec_ids: list) -> pd.DataFrame:
+    """Rows for rec_ids in API order, via the unique ISIN index."""
+    idxs = df.index.get_indexer(rec_ids)
+    return df.iloc[idxs[idxs >= 0]]
+
+
+# Table rows are deterministic in the returned id list, so cache the
+# serialized records instead of re-serializing the frame on every rerun;
+# the file mtime in the key invalidates when the data changes.
+@st.cache_data
+def get_table_rows(rec_ids_tuple: tuple, asset_mtime: float) -> list:
+    df = load_assets(ASSET_PARQUET_PATH)
+    return lookup_assets(df, list(rec_ids_tuple)).to_dict("records")
+
+
 try:
-    assets_df = load_assets(ASSET_CSV_PATH)
+    assets_df = load_assets(ASSET_PARQUET_PATH)
 except Exception as e:
-    st.error(f"Failed to load {ASSET_CSV_PATH}: {e}")
+    st.error(f"Failed to load {ASSET_PARQUET_PATH}: {e}")
     st.stop()
 
 if "ISIN" not in assets_df.columns:
-    st.warning("asset_information.csv has no 'ISIN' column. Table matching may fail.")
+    st.warning("asset_information.parquet has no 'ISIN' column. Table matching may fail.")
 
 
 # -----------------------------
@@ -113,9 +154,14 @@ if st.button("Get Recommendations 🚀"):
 
     try:
         with st.spinner("Calling FastAPI backend..."):
-            resp = requests.post(API_URL, json=payload, timeout=15)
+            resp = SESSION.post(
+                API_URL,
+                data=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=(3, 15),
+            )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
     except requests.HTTPError:
         st.error(f"API error {resp.status_code}: {resp.text}")
         st.stop()
@@ -140,19 +186,13 @@ if st.button("Get Recommendations 🚀"):
     # Join with assets metadata
     # -----------------------------
     if "ISIN" in assets_df.columns:
-        tmp = assets_df.copy()
-        tmp["ISIN"] = tmp["ISIN"].astype(str)
         rec_ids = [str(x) for x in rec_ids]
 
-        rec_df = tmp[tmp["ISIN"].isin(rec_ids)].copy()
-
-        # preserve API order
-        order_map = {isin: i for i, isin in enumerate(rec_ids)}
-        rec_df["__order"] = rec_df["ISIN"].map(order_map)
-        rec_df = rec_df.sort_values("__order").drop(columns="__order")
+        # Vectorized index lookups preserve API order; no full-column scan per click.
+        rec_df = lookup_assets(assets_df, rec_ids).copy()
 
         if rec_df.empty:
-            st.warning("Returned ISINs did not match any rows in asset_information.csv.")
+            st.warning("Returned ISINs did not match any rows in asset_information.parquet.")
             st.write("Tip: Check that the CSV column is named 'ISIN' and values match.")
             st.json(data)
             st.stop()
@@ -165,30 +205,38 @@ if st.button("Get Recommendations 🚀"):
     tab1, tab2 = st.tabs(["✨ Card View", "📋 Table View"])
 
     with tab1:
-        # Pick a nice title column if available
-        title_cols = ["assetName", "name", "ticker", "Ticker"]
-        for _, row in rec_df.iterrows():
+        # Pick a nice title column if available; resolve column presence once
+        # and iterate dict records instead of iterrows (no per-row Series).
+        title_cols = [c for c in ["assetName", "name", "ticker", "Ticker"] if c in rec_df.columns]
+        fields = ["assetCategory", "currency", "risk", "sector"]
+        present_fields = [f for f in fields if f in rec_df.columns]
+
+        for row in rec_df.to_dict("records"):
             with st.container(border=True):
                 title = None
                 for tc in title_cols:
-                    if tc in rec_df.columns and pd.notna(row.get(tc)):
-                        title = row.get(tc)
+                    if pd.notna(row[tc]):
+                        title = row[tc]
                         break
 
                 st.markdown(f"### {title if title else row.get('ISIN', '-')}")
                 st.caption(f"ISIN: `{row.get('ISIN', '-')}`")
 
-                # show common fields if present
-                fields = ["assetCategory", "currency", "risk", "sector"]
                 cols = st.columns(4)
                 for i, f in enumerate(fields):
-                    if f in rec_df.columns and pd.notna(row.get(f)):
-                        cols[i].metric(f, str(row.get(f)))
+                    if f in present_fields and pd.notna(row[f]):
+                        cols[i].metric(f, str(row[f]))
                     else:
                         cols[i].metric(f, "-")
 
     with tab2:
-        st.dataframe(rec_df, use_container_width=True)
+        if "ISIN" in assets_df.columns:
+            st.dataframe(
+                get_table_rows(tuple(rec_ids), os.path.getmtime(ASSET_PARQUET_PATH)),
+                use_container_width=True,
+            )
+        else:
+            st.dataframe(rec_df, use_container_width=True)
 
     st.download_button(
         "Download Recommendations CSV",